@@ -1,7 +1,7 @@
 # Automatically adjust the display brightness of Linux displays.
 #
 # Author: Peter Odding <peter@peterodding.com>
-# Last Change: April 17, 2017
+# Last Change: October 18, 2026
 # URL: https://github.com/xolox/python-auto-adjust-display-brightness
 
 """
@@ -16,12 +16,43 @@ adjusted in steps of 10% (unless --force is given).
 Supports back light brightness control using the Linux `/sys/class/backlight'
 interface as well as fall back to software brightness control using `xrandr'.
 
+Each brightness change is recorded in a binary history file (the size of this
+file is bounded) which can be queried using --stats.
+
+When `auto-adjust-display-brightness-helper' is running as root the program
+doesn't need super user privileges to control back light brightness.
+
 Supported options:
 
   -f, --force
 
     Adjust the display brightness in one step regardless of uptime.
 
+  -d, --daemon
+
+    Keep running in the foreground and adjust the display brightness once a
+    minute (instead of exiting after a single adjustment). While running as a
+    daemon displays and backlights that are added or removed (for example when
+    docking or undocking a laptop) are detected using kernel uevents and the
+    brightness of each display is published in a memory mapped status file
+    (for the benefit of status bars and panels).
+
+  -s, --stats
+
+    Show per display statistics about the recorded brightness changes (the
+    number of changes, how long they took and how much time was spent at each
+    brightness level) and exit.
+
+  --since=DATE
+
+    Ignore brightness changes before the given date (YYYY-MM-DD) in the
+    statistics shown by --stats.
+
+  --until=DATE
+
+    Ignore brightness changes on or after the given date (YYYY-MM-DD) in the
+    statistics shown by --stats.
+
   -v, --verbose
 
     Make more noise (increase logging verbosity).
@@ -67,6 +98,9 @@ CONFIG_FILES = [
     '~/.auto-adjust-display-brightness.ini',
 ]
 
+# The number of seconds between brightness adjustments in daemon mode.
+DAEMON_INTERVAL = 60
+
 
 def main():
     """Command line interface for the ``auto-adjust-display-brightness`` program."""
@@ -74,13 +108,24 @@ def main():
     coloredlogs.install()
     # Parse the command line arguments.
     step_brightness = None
+    daemon = False
+    show_stats = False
+    since, until = None, None
     try:
-        options, arguments = getopt.getopt(sys.argv[1:], 'fvqh', [
-            'force', 'verbose', 'quiet', 'help'
+        options, arguments = getopt.getopt(sys.argv[1:], 'fdsvqh', [
+            'force', 'daemon', 'stats', 'since=', 'until=', 'verbose', 'quiet', 'help'
         ])
         for option, value in options:
             if option in ('-f', '--force'):
                 step_brightness = False
+            elif option in ('-d', '--daemon'):
+                daemon = True
+            elif option in ('-s', '--stats'):
+                show_stats = True
+            elif option == '--since':
+                since = parse_date(value)
+            elif option == '--until':
+                until = parse_date(value)
             elif option in ('-v', '--verbose'):
                 coloredlogs.increase_verbosity()
             elif option in ('-q', '--quiet'):
@@ -93,37 +138,163 @@ def main():
     except Exception as e:
         warning("Failed to parse command line arguments! (%s)", e)
         sys.exit(1)
+    # Show statistics about the brightness history?
+    if show_stats:
+        from aadb.history import report_statistics
+        try:
+            report_statistics(since, until)
+        except EnvironmentError as e:
+            warning("Failed to read brightness history! (%s)", e)
+            sys.exit(1)
+        return
     # Load the configuration file(s).
     try:
         config = load_config()
     except ConfigurationError as e:
         warning("%s", e)
         sys.exit(1)
+    if daemon:
+        run_daemon(config, step_brightness)
+    else:
+        num_success, num_failed = adjust_brightness(config, step_brightness)
+        if num_failed > 0 and num_success == 0:
+            sys.exit(1)
+
+
+def adjust_brightness(config, step_brightness=None):
+    """
+    Adjust the brightness of the configured displays.
+
+    :param config: The dictionary returned by :py:func:`load_config()`.
+    :param step_brightness: ``True`` to change the brightness gradually,
+                            ``False`` to change the brightness at once or
+                            ``None`` to decide based on the system uptime.
+    :returns: A tuple of two integers with the number of displays whose
+              brightness was successfully changed and the number of
+              displays where changing the brightness failed.
+    """
     # Determine whether to change the brightness at once or gradually.
     if step_brightness is None:
         if find_system_uptime() < 60 * 5:
             logger.info("Changing brightness at once (system has just booted).")
             step_brightness = False
+            trigger = 'boot'
         else:
             logger.info("Changing brightness gradually (system has been running for a while).")
             step_brightness = True
-    else:
+            trigger = 'step'
+    elif not step_brightness:
         logger.info("Changing brightness at once (-f or --force was given).")
+        trigger = 'force'
+    else:
+        trigger = 'step'
     # Change the brightness of the configured display(s).
     dark_outside = is_it_dark_outside(latitude=float(config['location']['latitude']),
                                       longitude=float(config['location']['longitude']),
                                       elevation=float(config['location']['elevation']))
     method = 'decrease_brightness' if dark_outside else 'increase_brightness'
     num_success, num_failed = 0, 0
+    changed_controllers = []
+    last_changes = {}
     for controller in config['controllers']:
+        if not controller.available:
+            logger.debug("Skipping %s (display is currently not available).", controller)
+            continue
+        controller.target_percentage = (controller.minimum_percentage if dark_outside
+                                        else controller.maximum_percentage)
+        last_changes[controller] = controller.last_change
         try:
-            getattr(controller, method)(10 if step_brightness else 100)
+            if getattr(controller, method)(10 if step_brightness else 100):
+                changed_controllers.append(controller)
             num_success += 1
         except Exception as e:
             logger.warning("Failed to change brightness of %s! (%s)", controller, e)
             num_failed += 1
-    if num_failed > 0 and num_success == 0:
-        sys.exit(1)
+    # Send queued back light brightness changes to the privileged helper.
+    if config.get('helper'):
+        queued = [device_name for device_name, raw_brightness in config['helper'].pending]
+        started = time.time()
+        try:
+            failures = config['helper'].flush()
+        except EnvironmentError as e:
+            failures = dict((device_name, str(e)) for device_name in queued)
+        flush_duration = time.time() - started
+        for controller in config['controllers']:
+            if not (isinstance(controller, BacklightBrightnessController) and controller.device_name in queued):
+                continue
+            if controller.device_name not in failures:
+                # The change was only applied by the helper, so that's what we time.
+                controller.change_duration = flush_duration
+            else:
+                logger.warning("Failed to change brightness of %s! (%s)", controller, failures[controller.device_name])
+                num_success -= 1
+                num_failed += 1
+                changed_controllers.remove(controller)
+                # Forget about the change that was never applied.
+                controller.brightness = controller.previous_brightness
+                controller.last_change = last_changes[controller]
+    # Record the changes in the brightness history.
+    if changed_controllers:
+        from aadb.history import HistoryLog
+        try:
+            HistoryLog().append(changed_controllers, trigger)
+        except EnvironmentError as e:
+            logger.warning("Failed to record brightness history! (%s)", e)
+    return num_success, num_failed
+
+
+def run_daemon(config, step_brightness=None):
+    """
+    Keep adjusting the brightness of the configured displays until interrupted.
+
+    :param config: The dictionary returned by :py:func:`load_config()`.
+    :param step_brightness: Used for the first adjustment (refer to
+                            :py:func:`adjust_brightness()` for details),
+                            later adjustments are always based on the
+                            system uptime.
+
+    Displays and backlights that are added or removed while the daemon is
+    running are tracked using a :py:class:`~aadb.hotplug.HotplugMonitor`. The
+    state of the displays is published using a
+    :py:class:`~aadb.status.StatusExporter`.
+    """
+    from aadb.hotplug import HotplugMonitor
+    from aadb.status import StatusExporter
+    monitor = HotplugMonitor(config['controllers'])
+    try:
+        monitor.start()
+    except EnvironmentError as e:
+        logger.warning("Failed to listen for hotplug events, continuing without them! (%s)", e)
+        monitor = None
+    exporter = StatusExporter(config['controllers'])
+    try:
+        exporter.open()
+    except EnvironmentError as e:
+        logger.warning("Failed to create status file, continuing without it! (%s)", e)
+        exporter = None
+    try:
+        while True:
+            adjust_brightness(config, step_brightness)
+            step_brightness = None
+            if exporter:
+                exporter.publish()
+            deadline = time.time() + DAEMON_INTERVAL
+            while True:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                if monitor:
+                    if monitor.wait(timeout) and exporter:
+                        exporter.publish()
+                else:
+                    time.sleep(timeout)
+    except KeyboardInterrupt:
+        logger.info("Interrupted, shutting down ..")
+    finally:
+        if monitor:
+            monitor.stop()
+        if exporter:
+            exporter.close()
 
 
 def load_config():
@@ -131,13 +302,15 @@ def load_config():
     Load settings from the given configuration file.
 
     :param pathname: The pathname of the configuration file (a string).
-    :returns: A dictionary with the configured location and display
-              brightness controllers.
+    :returns: A dictionary with the configured location, display brightness
+              controllers and privileged helper (see
+              :py:func:`aadb.helper.find_helper()`).
     :raises: :py:exc:`ConfigurationError` when the parsing or validation of the
              configuration file fails.
     """
+    from aadb.helper import find_helper
     parser = ConfigParser.ConfigParser()
-    config = {'location': {}, 'controllers': []}
+    config = {'location': {}, 'controllers': [], 'helper': find_helper()}
     loaded_files = parser.read(map(os.path.expanduser, CONFIG_FILES))
     if not loaded_files:
         msg = "No configuration files loaded! Please review the documentation on how to get started!"
@@ -165,6 +338,7 @@ def load_config():
                     minimum_percentage=int(options['min-brightness']),
                     maximum_percentage=int(options['max-brightness']),
                     sys_directory=options['sys-directory'],
+                    helper=config['helper'],
                 ))
             else:
                 msg = "Don't know how to control brightness of %r display defined in configuration file!"
@@ -180,6 +354,17 @@ def load_config():
     return config
 
 
+def parse_date(value):
+    """
+    Parse a date given on the command line.
+
+    :param value: A date in the format ``YYYY-MM-DD`` (a string).
+    :returns: The number of seconds since the Unix epoch at the start of the
+              given date in the local timezone (a floating point number).
+    """
+    return time.mktime(datetime.datetime.strptime(value, '%Y-%m-%d').timetuple())
+
+
 def find_system_uptime():
     """
     Find the uptime of the system by parsing ``/proc/uptime``.
@@ -308,6 +493,13 @@ class BrightnessController(object):
         self.friendly_name = friendly_name
         self.minimum_percentage = minimum_percentage
         self.maximum_percentage = maximum_percentage
+        self.available = True
+        # The most recent state of the display (used by aadb.status and aadb.history).
+        self.brightness = None
+        self.previous_brightness = None
+        self.target_percentage = None
+        self.last_change = None
+        self.change_duration = None
 
     def __str__(self):
         """
@@ -317,6 +509,17 @@ class BrightnessController(object):
         """
         return self.friendly_name
 
+    def invalidate(self):
+        """
+        Forget any cached information about the display.
+
+        This method is called when the kernel reports that the display was
+        (re)attached or changed, so that cached values (like the maximum
+        brightness) are queried again on the next brightness change. The
+        default implementation does nothing because not all brightness
+        controllers cache information.
+        """
+
     def increase_brightness(self, step_size=10):
         """
         Increase the brightness of the display by the given percentage.
@@ -339,10 +542,11 @@ class BrightnessController(object):
         # invoking kernel mechanisms when nothing will change).
         if new_brightness != current_brightness:
             self.report_brightness_change(old_percentage, new_percentage)
-            self.change_brightness(new_brightness)
+            self.apply_brightness_change(current_brightness, new_brightness)
             return True
         else:
             logger.info("Brightness of %s is already high enough.", self.friendly_name)
+            self.brightness = current_brightness
             return False
 
     def decrease_brightness(self, step_size=10):
@@ -367,12 +571,35 @@ class BrightnessController(object):
         # invoking kernel mechanisms when nothing will change).
         if new_brightness != current_brightness:
             self.report_brightness_change(old_percentage, new_percentage)
-            self.change_brightness(new_brightness)
+            self.apply_brightness_change(current_brightness, new_brightness)
             return True
         else:
             logger.info("Brightness of %s is already low enough.", self.friendly_name)
+            self.brightness = current_brightness
             return False
 
+    def apply_brightness_change(self, old_brightness, new_brightness):
+        """
+        Change the brightness of the display and remember the change.
+
+        :param old_brightness: The old raw brightness value (a number).
+        :param new_brightness: The new raw brightness value (a number).
+
+        The change is remembered in :py:attr:`previous_brightness`,
+        :py:attr:`brightness`, :py:attr:`last_change` and
+        :py:attr:`change_duration` (for the benefit of :py:mod:`aadb.status`
+        and :py:mod:`aadb.history`). The duration is the number of seconds it
+        took to apply the new brightness (for changes that are queued for the
+        privileged helper :py:func:`adjust_brightness()` replaces it with the
+        time it took the helper to apply the batch of changes).
+        """
+        started = time.time()
+        self.change_brightness(new_brightness)
+        self.last_change = time.time()
+        self.change_duration = self.last_change - started
+        self.previous_brightness = old_brightness
+        self.brightness = new_brightness
+
     def report_brightness_change(self, old_percentage, new_percentage):
         """
         Report a change in brightness to the user via the terminal.
@@ -585,11 +812,20 @@ class BacklightBrightnessController(BrightnessController):
 
         :param sys_directory: The pathname of the ``/sys/class/backlight``
                               subdirectory to be used (a string).
+        :param helper: A :py:class:`~aadb.helper.HelperClient` object that
+                       is used to change the brightness without super user
+                       privileges (optional).
         """
         self.sys_directory = kw.pop('sys_directory')
+        self.helper = kw.pop('helper', None)
         self.max_brightness = None
         super(BacklightBrightnessController, self).__init__(**kw)
 
+    @property
+    def device_name(self):
+        """The name of the back light device (the last component of :py:attr:`sys_directory`)."""
+        return os.path.basename(os.path.normpath(self.sys_directory))
+
     def get_current_brightness(self):
         """
         Get the current brightness of the display (as a raw value).
@@ -620,6 +856,10 @@ class BacklightBrightnessController(BrightnessController):
                 self.max_brightness = int(handle.read())
         return self.max_brightness
 
+    def invalidate(self):
+        """Forget the cached maximum brightness of the back light."""
+        self.max_brightness = None
+
     def round_brightness(self, raw_brightness):
         """
         Round the given brightness (a raw value) to an acceptable value.
@@ -635,11 +875,18 @@ class BacklightBrightnessController(BrightnessController):
         Change the brightness of the display.
 
         This method writes the brightness to
-        ``/sys/class/backlight/<name>/brightness``.
+        ``/sys/class/backlight/<name>/brightness``. When a privileged helper
+        is available the change is queued instead, to be sent to the helper
+        (together with the changes of other back lights) by
+        :py:func:`adjust_brightness()`.
 
         :param raw_brightness: A number representing the brightness to be
                                configured.
         """
+        if self.helper:
+            logger.debug("Queueing brightness change of %s to %s (raw value) ..", self.friendly_name, raw_brightness)
+            self.helper.queue(self.device_name, raw_brightness)
+            return
         logger.debug("Setting brightness of %s to %s (raw value) ..", self.friendly_name, raw_brightness)
         try:
             filename = os.path.join(self.sys_directory, 'brightness')
@@ -651,7 +898,8 @@ class BacklightBrightnessController(BrightnessController):
                 # Give a user friendly explanation.
                 raise IOError(e.errno, compact("""
                     To control backlight brightness you need super user privileges!
-                    (consider using `sudo' to run the program?)
+                    (consider running `auto-adjust-display-brightness-helper'
+                    as root or using `sudo' to run the program?)
                 """))
             # Don't swallow errors we don't know what to do with.
             raise
@@ -0,0 +1,446 @@
+# Automatically adjust the display brightness of Linux displays.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://github.com/xolox/python-auto-adjust-display-brightness
+
+"""
+Usage: auto-adjust-display-brightness-helper [OPTIONS]
+
+Privileged helper that changes back light brightness on behalf of
+`auto-adjust-display-brightness' so that the main program doesn't need to run
+as root. The helper listens on a UNIX socket for batches of brightness changes,
+validates them against the `max_brightness' of each device and writes them to
+`/sys/class/backlight/<name>/brightness'.
+
+Supported options:
+
+  -s, --socket=PATH
+
+    Listen on the given UNIX socket (defaults to
+    `/run/auto-adjust-display-brightness.sock').
+
+  -u, --allow-user=NAME
+
+    Accept brightness changes from the given user (this option can be
+    repeated and is required, brightness changes from other users are
+    rejected).
+
+  -v, --verbose
+
+    Make more noise (increase logging verbosity).
+
+  -q, --quiet
+
+    Make less noise (decrease logging verbosity).
+
+  -h, --help
+
+    Show this message and exit.
+"""
+
+# Standard library modules.
+import errno
+import getopt
+import logging
+import os
+import platform
+import pwd
+import re
+import signal
+import socket
+import struct
+import sys
+import time
+
+# External dependencies.
+import coloredlogs
+from humanfriendly.terminal import usage, warning
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+# The default location of the UNIX socket of the helper.
+HELPER_SOCKET = '/run/auto-adjust-display-brightness.sock'
+
+# The directory that contains the back light devices.
+BACKLIGHT_DIRECTORY = '/sys/class/backlight'
+
+# Back light device names accepted by the helper.
+DEVICE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_:-][A-Za-z0-9_.:-]*$')
+
+# The maximum size of a single batch of brightness changes (in bytes).
+MAX_REQUEST_SIZE = 1024 * 16
+
+# The number of seconds the helper waits for a client to send its entire
+# request (and the client waits for the entire response).
+REQUEST_TIMEOUT = 5
+
+# The number of seconds to wait while checking whether the helper is running.
+CONNECT_TIMEOUT = 1
+
+# The values of the SO_PEERCRED socket option on architectures where it differs
+# from the generic value (see asm/socket.h in the Linux kernel sources). This
+# is needed because Python 2 doesn't define socket.SO_PEERCRED.
+SO_PEERCRED_VALUES = (
+    ('alpha', 18),
+    ('mips', 18),
+    ('parisc', 0x4011),
+    ('ppc', 21),
+    ('powerpc', 21),
+    ('sparc', 0x0040),
+)
+
+
+def main():
+    """Command line interface for the ``auto-adjust-display-brightness-helper`` program."""
+    # Initialize logging to the terminal.
+    coloredlogs.install()
+    # Parse the command line arguments.
+    socket_file = HELPER_SOCKET
+    allowed_users = set()
+    try:
+        options, arguments = getopt.getopt(sys.argv[1:], 's:u:vqh', [
+            'socket=', 'allow-user=', 'verbose', 'quiet', 'help'
+        ])
+        for option, value in options:
+            if option in ('-s', '--socket'):
+                socket_file = value
+            elif option in ('-u', '--allow-user'):
+                allowed_users.add(pwd.getpwnam(value).pw_uid)
+            elif option in ('-v', '--verbose'):
+                coloredlogs.increase_verbosity()
+            elif option in ('-q', '--quiet'):
+                coloredlogs.decrease_verbosity()
+            elif option in ('-h', '--help'):
+                usage(__doc__)
+                return
+            else:
+                assert False, "Unhandled option!"
+    except Exception as e:
+        warning("Failed to parse command line arguments! (%s)", e)
+        sys.exit(1)
+    if not allowed_users:
+        warning("Please use --allow-user to specify who is allowed to change the brightness!")
+        sys.exit(1)
+    # Serve requests until we're interrupted or terminated (so that the
+    # socket is removed when the helper is stopped as a service).
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    server = HelperServer(socket_file, allowed_users)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Interrupted, shutting down ..")
+    finally:
+        server.close()
+
+
+def handle_sigterm(signum, frame):
+    """Handle ``SIGTERM`` the same way as ``SIGINT`` (by raising :py:exc:`~exceptions.KeyboardInterrupt`)."""
+    raise KeyboardInterrupt()
+
+
+def find_helper(socket_file=HELPER_SOCKET):
+    """
+    Find out whether back light brightness should be changed using the helper.
+
+    :param socket_file: The pathname of the UNIX socket of the helper (a string).
+    :returns: A :py:class:`HelperClient` object when the current process
+              doesn't run as ``root`` and the helper is running, ``None``
+              otherwise.
+
+    The helper is considered to be running when a connection to its socket
+    can be established (a socket left behind by a helper that was killed
+    doesn't count).
+    """
+    if os.getuid() != 0 and os.path.exists(socket_file):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.settimeout(CONNECT_TIMEOUT)
+            probe.connect(socket_file)
+        except socket.error as e:
+            logger.debug("Ignoring privileged helper socket %s! (%s)", socket_file, e)
+            return None
+        finally:
+            probe.close()
+        logger.debug("Using privileged helper at %s to change back light brightness.", socket_file)
+        return HelperClient(socket_file)
+
+
+def get_peercred_option():
+    """
+    Get the value of the ``SO_PEERCRED`` socket option (see ``socket(7)``).
+
+    :returns: The value of the socket option (an integer).
+
+    On Python 3 this is :py:data:`socket.SO_PEERCRED`. Python 2 doesn't
+    define this constant so the value is looked up based on the processor
+    architecture reported by :py:func:`platform.machine()`. Architectures
+    that aren't listed in :data:`SO_PEERCRED_VALUES` are assumed to use the
+    generic value 17 (this is correct for x86, ARM, RISC-V and s390).
+    """
+    if hasattr(socket, 'SO_PEERCRED'):
+        return socket.SO_PEERCRED
+    machine = platform.machine().lower()
+    for prefix, value in SO_PEERCRED_VALUES:
+        if machine.startswith(prefix):
+            return value
+    return 17
+
+
+def receive_all(sock, limit=MAX_REQUEST_SIZE, timeout=REQUEST_TIMEOUT):
+    """
+    Receive data from a socket until the other side stops sending.
+
+    :param sock: The socket to receive data from.
+    :param limit: The maximum number of bytes to receive (an integer).
+    :param timeout: The maximum number of seconds to wait for all of the data
+                    (a number). This is an overall deadline, so a peer that
+                    sends data very slowly can't keep us waiting.
+    :returns: The received data (a byte string).
+    :raises: :py:exc:`~exceptions.ValueError` when more than `limit` bytes
+             are received, :py:exc:`socket.timeout` when the deadline expires.
+    """
+    deadline = time.time() + timeout
+    chunks, size = [], 0
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise socket.timeout("Timed out waiting for data!")
+        sock.settimeout(remaining)
+        data = sock.recv(4096)
+        if not data:
+            return b''.join(chunks)
+        size += len(data)
+        if size > limit:
+            raise ValueError("Request too large!")
+        chunks.append(data)
+
+
+class HelperClient(object):
+
+    """Send batches of back light brightness changes to the privileged helper."""
+
+    def __init__(self, socket_file=HELPER_SOCKET):
+        """
+        Initialize a :py:class:`HelperClient` object.
+
+        :param socket_file: The pathname of the UNIX socket of the helper (a string).
+        """
+        self.socket_file = socket_file
+        self.pending = []
+
+    def queue(self, device_name, raw_brightness):
+        """
+        Queue a brightness change to be sent by :py:func:`flush()`.
+
+        :param device_name: The name of the back light device (a string).
+        :param raw_brightness: The raw brightness value (an integer).
+        """
+        self.pending.append((device_name, int(raw_brightness)))
+
+    def flush(self):
+        """
+        Send the queued brightness changes to the helper in a single message.
+
+        :returns: A dictionary with the names of the devices whose brightness
+                  couldn't be changed as keys and error messages as values.
+        :raises: :py:exc:`socket.error` when the helper can't be reached.
+        """
+        pending, self.pending = self.pending, []
+        if not pending:
+            return {}
+        logger.debug("Sending %i brightness change(s) to privileged helper ..", len(pending))
+        request = ''.join('%s %i\n' % change for change in pending)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.settimeout(REQUEST_TIMEOUT)
+            client.connect(self.socket_file)
+            client.sendall(request.encode('ascii'))
+            client.shutdown(socket.SHUT_WR)
+            response = receive_all(client)
+        finally:
+            client.close()
+        failures = {}
+        replies = response.decode('UTF-8', 'replace').splitlines()
+        if len(replies) == 1 and len(pending) > 1 and replies[0].startswith('ERROR'):
+            # The helper rejected the request as a whole.
+            replies *= len(pending)
+        for index, (device_name, raw_brightness) in enumerate(pending):
+            reply = replies[index] if index < len(replies) else 'ERROR No response from helper!'
+            if reply != 'OK':
+                failures[device_name] = reply.partition(' ')[2]
+        return failures
+
+
+class HelperServer(object):
+
+    """Accept batches of back light brightness changes on a UNIX socket."""
+
+    def __init__(self, socket_file=HELPER_SOCKET, allowed_users=None):
+        """
+        Initialize a :py:class:`HelperServer` object.
+
+        :param socket_file: The pathname of the UNIX socket (a string).
+        :param allowed_users: A set of user ids whose requests are accepted
+                              (requests from other users are rejected).
+        """
+        self.socket_file = socket_file
+        self.allowed_users = allowed_users or set()
+        self.devices = {}
+        self.socket = None
+
+    def listen(self):
+        """Create the UNIX socket (replacing a stale socket if necessary)."""
+        if os.path.exists(self.socket_file):
+            os.unlink(self.socket_file)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.bind(self.socket_file)
+        # Access control is based on the credentials of the client.
+        os.chmod(self.socket_file, 0o666)
+        self.socket.listen(5)
+        logger.info("Listening for brightness changes on %s ..", self.socket_file)
+
+    def serve_forever(self):
+        """Handle requests until interrupted."""
+        self.listen()
+        while True:
+            client, _ = self.socket.accept()
+            try:
+                self.handle_client(client)
+            except Exception as e:
+                logger.warning("Failed to handle request! (%s)", e)
+            finally:
+                client.close()
+
+    def close(self):
+        """Close the UNIX socket and the back light devices."""
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+            if os.path.exists(self.socket_file):
+                os.unlink(self.socket_file)
+        for device in self.devices.values():
+            device.close()
+        self.devices.clear()
+
+    def handle_client(self, client):
+        """
+        Handle a single request.
+
+        :param client: The socket of the client.
+
+        Requests from users that aren't allowed are rejected (with a single
+        error reply) before the request is read.
+        """
+        credentials = client.getsockopt(socket.SOL_SOCKET, get_peercred_option(), struct.calcsize('3i'))
+        pid, uid, gid = struct.unpack('3i', credentials)
+        client.settimeout(REQUEST_TIMEOUT)
+        if uid not in self.allowed_users:
+            logger.warning("Rejected request from process %i (user %i is not allowed).", pid, uid)
+            client.sendall(b'ERROR Permission denied!\n')
+            # Discard the unread request (for at most a second) because
+            # closing the socket with unread data resets the connection,
+            # in which case the client wouldn't see the reply.
+            client.shutdown(socket.SHUT_WR)
+            try:
+                receive_all(client, MAX_REQUEST_SIZE, CONNECT_TIMEOUT)
+            except (socket.error, ValueError):
+                pass
+            return
+        request = receive_all(client, MAX_REQUEST_SIZE)
+        replies = []
+        for line in request.decode('ascii', 'replace').splitlines():
+            try:
+                device_name, raw_brightness = self.parse_change(line)
+                self.change_brightness(device_name, raw_brightness)
+                replies.append('OK\n')
+            except Exception as e:
+                logger.warning("Rejected brightness change %r from user %i! (%s)", line, uid, e)
+                replies.append('ERROR %s\n' % e)
+        client.settimeout(REQUEST_TIMEOUT)
+        client.sendall(''.join(replies).encode('UTF-8'))
+
+    def parse_change(self, line):
+        """
+        Parse and validate a single brightness change.
+
+        :param line: A line of text containing a device name and raw
+                     brightness value separated by whitespace (a string).
+        :returns: A tuple with the device name (a string) and the raw
+                  brightness value (an integer).
+        :raises: :py:exc:`~exceptions.ValueError` when the line is invalid.
+        """
+        tokens = line.split()
+        if len(tokens) != 2 or not DEVICE_NAME_PATTERN.match(tokens[0]) or not tokens[1].isdigit():
+            raise ValueError("Invalid brightness change!")
+        return tokens[0], int(tokens[1])
+
+    def change_brightness(self, device_name, raw_brightness):
+        """
+        Change the brightness of a back light device.
+
+        :param device_name: The name of the back light device (a string).
+        :param raw_brightness: The raw brightness value (an integer).
+        :raises: :py:exc:`~exceptions.ValueError` when the brightness is out
+                 of range, :py:exc:`~exceptions.EnvironmentError` when the
+                 device can't be written.
+
+        Devices are opened on first use and kept open. When a device has
+        disappeared in the mean time (for example because it was hot plugged)
+        it is reopened once.
+        """
+        for attempt in (1, 2):
+            device = self.devices.get(device_name)
+            if device is None:
+                device = BacklightDevice(device_name)
+                self.devices[device_name] = device
+            try:
+                device.write(raw_brightness)
+                return
+            except EnvironmentError as e:
+                del self.devices[device_name]
+                device.close()
+                if attempt == 2 or e.errno not in (errno.ENODEV, errno.ENOENT, errno.ENXIO):
+                    raise
+
+
+class BacklightDevice(object):
+
+    """An open back light device in ``/sys/class/backlight``."""
+
+    def __init__(self, name):
+        """
+        Open a back light device.
+
+        :param name: The name of the back light device (a string).
+        :raises: :py:exc:`~exceptions.EnvironmentError` when the device
+                 doesn't exist.
+        """
+        self.name = name
+        directory = os.path.join(BACKLIGHT_DIRECTORY, name)
+        with open(os.path.join(directory, 'max_brightness')) as handle:
+            self.max_brightness = int(handle.read())
+        self.fd = os.open(os.path.join(directory, 'brightness'), os.O_WRONLY)
+        logger.debug("Opened back light device %s (max brightness is %i).", name, self.max_brightness)
+
+    def write(self, raw_brightness):
+        """
+        Change the brightness of the back light device.
+
+        :param raw_brightness: The raw brightness value (an integer).
+        :raises: :py:exc:`~exceptions.ValueError` when the brightness is out of range.
+        """
+        if not 0 <= raw_brightness <= self.max_brightness:
+            msg = "Brightness %i of %s is out of range (0-%i)!"
+            raise ValueError(msg % (raw_brightness, self.name, self.max_brightness))
+        logger.info("Setting brightness of %s to %i (raw value) ..", self.name, raw_brightness)
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        os.write(self.fd, str(raw_brightness).encode('ascii'))
+
+    def close(self):
+        """Close the back light device."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
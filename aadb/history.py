@@ -0,0 +1,433 @@
+# Automatically adjust the display brightness of Linux displays.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://github.com/xolox/python-auto-adjust-display-brightness
+
+"""
+Binary history of display brightness changes.
+
+Each brightness change is recorded in a history file consisting of a header
+(:data:`HEADER_FORMAT`) followed by fixed size records (:data:`RECORD_FORMAT`).
+The records form a ring buffer of :data:`HISTORY_CAPACITY` entries, so the size
+of the history file is bounded: once the ring buffer is full the oldest records
+are overwritten.
+
+Because the records are fixed size and ordered by time the history can be
+queried by memory mapping the file and using a binary search to find the
+records in a given date range (see :py:class:`HistoryReader`), no text needs
+to be parsed. The brightness level of each display at the start of a date range
+is found by scanning backwards from the start of the date range, this scan is
+limited to :data:`LOOKBEHIND_RECORDS` records.
+"""
+
+# Standard library modules.
+import collections
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import time
+
+# External dependencies.
+from humanfriendly import format_timespan
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+# The locations of the history file (when running as root and otherwise).
+HISTORY_FILES = [
+    '/var/log/auto-adjust-display-brightness.history',
+    '~/.auto-adjust-display-brightness.history',
+]
+
+# The magic bytes at the start of the history file.
+MAGIC = b'AADH'
+
+# The version of the layout of the history file.
+VERSION = 1
+
+# The layout of the header: magic, version, reserved, capacity of the ring
+# buffer and the total number of records ever written.
+HEADER_FORMAT = '<4sHHIQ'
+
+# The layout of a record: timestamp (seconds since the Unix epoch), name of the
+# display, old raw brightness, new raw brightness, duration of the change (the
+# number of seconds it took to apply the new brightness, for changes applied by
+# the privileged helper this is the round trip time of the batch of changes)
+# and the trigger of the change (an index into TRIGGERS).
+RECORD_FORMAT = '<d32sdddB7x'
+
+# The number of records in the ring buffer of a new history file.
+HISTORY_CAPACITY = 16384
+
+# The maximum number of records before the start of a date range that are
+# scanned to find the brightness levels at the start of the date range.
+LOOKBEHIND_RECORDS = 1024
+
+# The events that can trigger a brightness change.
+TRIGGERS = ('unknown', 'step', 'boot', 'force')
+
+HistoryRecord = collections.namedtuple('HistoryRecord', (
+    'timestamp', 'name', 'old_value', 'new_value', 'duration', 'trigger',
+))
+"""A single brightness change (a :py:func:`~collections.namedtuple()`)."""
+
+
+def get_history_file():
+    """
+    Get the location of the history file.
+
+    :returns: The pathname of the history file (a string).
+    """
+    return os.path.expanduser(HISTORY_FILES[0 if os.getuid() == 0 else 1])
+
+
+def report_statistics(since=None, until=None, filename=None):
+    """
+    Print per display statistics about brightness changes to the terminal.
+
+    :param since: Ignore changes before this time (a number of seconds since
+                  the Unix epoch or ``None``).
+    :param until: Ignore changes after this time (a number of seconds since the
+                  Unix epoch or ``None``).
+    :param filename: The pathname of the history file (a string, defaults to
+                     the result of :py:func:`get_history_file()`).
+    """
+    reader = HistoryReader(filename)
+    try:
+        statistics = reader.get_statistics(since, until)
+    finally:
+        reader.close()
+    if not statistics:
+        print("No brightness changes recorded in the given date range.")
+    for name in sorted(statistics):
+        stats = statistics[name]
+        print("%s:" % name)
+        print(" - Number of changes: %i (%s)" % (stats.num_changes, ', '.join(
+            '%i %s' % (n, t) for t, n in sorted(stats.triggers.items())
+        )))
+        if stats.num_changes > 0:
+            print(" - Average duration of a single write: %s" % format_timespan(stats.total_duration / stats.num_changes))
+        if stats.num_fades > 0:
+            print(" - Number of fades: %i (average length %s)" % (
+                stats.num_fades, format_timespan(stats.total_fade_time / stats.num_fades),
+            ))
+        print(" - Time spent at brightness levels (raw values):")
+        for level in sorted(stats.time_at_level):
+            print("    - %s: %s" % (format_level(level), format_timespan(stats.time_at_level[level])))
+
+
+def format_level(value):
+    """
+    Format a raw brightness value.
+
+    :param value: A floating point number.
+    :returns: A string (integers are formatted without decimals).
+    """
+    return '%i' % value if value == int(value) else '%.2f' % value
+
+
+def encode_record(controller, trigger):
+    """
+    Get the values of the record that describes a brightness change.
+
+    :param controller: A :py:class:`.BrightnessController` object.
+    :param trigger: The event that triggered the change (a string).
+    :returns: A tuple of values matching :data:`RECORD_FORMAT`.
+    """
+    name = controller.friendly_name
+    if not isinstance(name, bytes):
+        name = name.encode('UTF-8')
+    return (controller.last_change,
+            name[:32],
+            float(controller.previous_brightness),
+            float(controller.brightness),
+            controller.change_duration,
+            TRIGGERS.index(trigger) if trigger in TRIGGERS else 0)
+
+
+def get_record_offset(position):
+    """
+    Get the offset of a record in the history file.
+
+    :param position: The position of the record in the ring buffer (an integer).
+    :returns: The offset in bytes (an integer).
+    """
+    return struct.calcsize(HEADER_FORMAT) + position * struct.calcsize(RECORD_FORMAT)
+
+
+class HistoryLog(object):
+
+    """Append brightness changes to the history file."""
+
+    def __init__(self, filename=None, capacity=HISTORY_CAPACITY):
+        """
+        Initialize a :py:class:`HistoryLog` object.
+
+        :param filename: The pathname of the history file (a string, defaults
+                         to the result of :py:func:`get_history_file()`).
+        :param capacity: The number of records in the ring buffer (an integer,
+                         only used when the history file is created).
+        """
+        if capacity < 1:
+            raise ValueError("The capacity of the history file must be at least one record!")
+        self.filename = filename or get_history_file()
+        self.capacity = capacity
+
+    def append(self, controllers, trigger):
+        """
+        Record the most recent brightness change of one or more displays.
+
+        :param controllers: A list of :py:class:`.BrightnessController` objects
+                            whose brightness was just changed.
+        :param trigger: The event that triggered the changes (one of the
+                        strings in :data:`TRIGGERS`).
+        :raises: :py:exc:`~exceptions.EnvironmentError` when the history file
+                 can't be written.
+
+        Timestamps are never allowed to decrease (even when the system clock
+        is changed) because :py:class:`HistoryReader` uses a binary search
+        that depends on the records being ordered by time.
+        """
+        fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Serialize concurrent writers (e.g. overlapping cron runs).
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.read(fd, struct.calcsize(HEADER_FORMAT))
+            if len(header) == struct.calcsize(HEADER_FORMAT):
+                magic, version, _, capacity, count = struct.unpack(HEADER_FORMAT, header)
+                if magic != MAGIC or version != VERSION or capacity < 1:
+                    raise IOError("Unsupported history file format in %s!" % self.filename)
+            else:
+                logger.debug("Creating history file %s ..", self.filename)
+                capacity, count = self.capacity, 0
+            last_timestamp = 0.0
+            if count > 0:
+                os.lseek(fd, get_record_offset((count - 1) % capacity), os.SEEK_SET)
+                data = os.read(fd, struct.calcsize('<d'))
+                if len(data) == struct.calcsize('<d'):
+                    last_timestamp = struct.unpack('<d', data)[0]
+            for controller in controllers:
+                values = list(encode_record(controller, trigger))
+                values[0] = last_timestamp = max(values[0], last_timestamp)
+                os.lseek(fd, get_record_offset(count % capacity), os.SEEK_SET)
+                os.write(fd, struct.pack(RECORD_FORMAT, *values))
+                count += 1
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, struct.pack(HEADER_FORMAT, MAGIC, VERSION, 0, capacity, count))
+        finally:
+            os.close(fd)
+
+
+class HistoryReader(object):
+
+    """Query the history file using a memory mapping."""
+
+    def __init__(self, filename=None):
+        """
+        Initialize a :py:class:`HistoryReader` object.
+
+        :param filename: The pathname of the history file (a string, defaults
+                         to the result of :py:func:`get_history_file()`).
+        :raises: :py:exc:`~exceptions.EnvironmentError` when the history file
+                 doesn't exist or is invalid.
+        """
+        self.filename = filename or get_history_file()
+        self.mapping = None
+        with open(self.filename, 'rb') as handle:
+            file_size = os.fstat(handle.fileno()).st_size
+            if file_size < struct.calcsize(HEADER_FORMAT):
+                raise IOError("The history file %s is empty or incomplete!" % self.filename)
+            self.mapping = mmap.mmap(handle.fileno(), 0, mmap.MAP_SHARED, mmap.PROT_READ)
+        magic, version, _, self.capacity, count = struct.unpack_from(HEADER_FORMAT, self.mapping, 0)
+        if magic != MAGIC or version != VERSION or self.capacity < 1:
+            self.close()
+            raise IOError("Unsupported history file format in %s!" % self.filename)
+        # Find the oldest record in the ring buffer.
+        self.size = min(count, self.capacity)
+        self.start = count % self.capacity if count > self.capacity else 0
+        if file_size < get_record_offset(self.size):
+            self.close()
+            raise IOError("The history file %s is incomplete!" % self.filename)
+
+    def close(self):
+        """Unmap the history file."""
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+
+    def get_timestamp(self, index):
+        """
+        Get the timestamp of a record.
+
+        :param index: The logical index of a record (0 is the oldest record).
+        :returns: The timestamp (a floating point number).
+        """
+        return struct.unpack_from('<d', self.mapping, get_record_offset((self.start + index) % self.capacity))[0]
+
+    def get_record(self, index):
+        """
+        Get a record.
+
+        :param index: The logical index of a record (0 is the oldest record).
+        :returns: A :py:class:`HistoryRecord` object.
+        """
+        offset = get_record_offset((self.start + index) % self.capacity)
+        timestamp, name, old_value, new_value, duration, trigger = struct.unpack_from(RECORD_FORMAT, self.mapping, offset)
+        return HistoryRecord(timestamp=timestamp,
+                             name=name.rstrip(b'\0').decode('UTF-8', 'replace'),
+                             old_value=old_value,
+                             new_value=new_value,
+                             duration=duration,
+                             trigger=TRIGGERS[trigger] if trigger < len(TRIGGERS) else TRIGGERS[0])
+
+    def find_index(self, timestamp):
+        """
+        Find the first record at or after the given time (using a binary search).
+
+        :param timestamp: A number of seconds since the Unix epoch.
+        :returns: The logical index of a record (an integer).
+        """
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get_records(self, since=None, until=None):
+        """
+        Get the records in a date range.
+
+        :param since: Ignore changes before this time (a number of seconds
+                      since the Unix epoch or ``None``).
+        :param until: Ignore changes after this time (a number of seconds since
+                      the Unix epoch or ``None``).
+        :returns: A generator of :py:class:`HistoryRecord` objects.
+        """
+        first = self.find_index(since) if since is not None else 0
+        last = self.find_index(until) if until is not None else self.size
+        for index in range(first, last):
+            yield self.get_record(index)
+
+    def get_statistics(self, since=None, until=None):
+        """
+        Calculate per display statistics about the brightness changes in a date range.
+
+        :param since: Ignore changes before this time (a number of seconds
+                      since the Unix epoch or ``None``).
+        :param until: Ignore changes after this time (a number of seconds since
+                      the Unix epoch or ``None``, in which case the current
+                      time is used to calculate the time spent at the most
+                      recent brightness level).
+        :returns: A dictionary with display names as keys and
+                  :py:class:`DisplayStatistics` objects as values.
+
+        Displays that didn't change during the date range are included when
+        they changed in the :data:`LOOKBEHIND_RECORDS` records before the date
+        range (all of the time in the date range is then spent at the
+        brightness level of their last change).
+
+        Consecutive changes of a display that were triggered by ``step`` and go
+        in the same direction are grouped into fades, the length of a fade is
+        the time between its first and last change.
+        """
+        statistics = {}
+        if since is not None:
+            # Find the brightness level of each display at the start of the
+            # date range (based on the last change before the date range).
+            # Displays that change during the date range don't need this
+            # (the old value of their first change is used instead) so the
+            # scan is limited to a bounded number of records.
+            first = self.find_index(since)
+            for index in reversed(range(max(0, first - LOOKBEHIND_RECORDS), first)):
+                record = self.get_record(index)
+                if record.name not in statistics:
+                    stats = DisplayStatistics()
+                    stats.level = record.new_value
+                    stats.level_since = since
+                    statistics[record.name] = stats
+        for record in self.get_records(since, until):
+            stats = statistics.get(record.name)
+            if stats is None:
+                stats = DisplayStatistics()
+                statistics[record.name] = stats
+                if since is not None:
+                    # Count the time between the start of the date range and
+                    # the first change at the brightness level before the change.
+                    stats.add_time(record.old_value, record.timestamp - since)
+            else:
+                stats.add_time(stats.level, record.timestamp - stats.level_since)
+            stats.num_changes += 1
+            stats.total_duration += record.duration
+            stats.triggers[record.trigger] = stats.triggers.get(record.trigger, 0) + 1
+            stats.add_fade_step(record)
+            stats.level = record.new_value
+            stats.level_since = record.timestamp
+        end = until if until is not None else time.time()
+        for stats in statistics.values():
+            stats.add_time(stats.level, end - stats.level_since)
+            stats.finish_fade()
+        return statistics
+
+
+class DisplayStatistics(object):
+
+    """Aggregated brightness changes of a single display (see :py:func:`HistoryReader.get_statistics()`)."""
+
+    def __init__(self):
+        """Initialize a :py:class:`DisplayStatistics` object."""
+        self.num_changes = 0
+        self.total_duration = 0.0
+        self.triggers = {}
+        self.time_at_level = {}
+        self.level = None
+        self.level_since = None
+        self.num_fades = 0
+        self.total_fade_time = 0.0
+        self.fade_direction = 0
+        self.fade_start = None
+        self.fade_end = None
+
+    def add_time(self, level, seconds):
+        """
+        Add to the time spent at a brightness level.
+
+        :param level: The raw brightness value (a number).
+        :param seconds: The number of seconds spent at the brightness level.
+        """
+        if seconds > 0:
+            self.time_at_level[level] = self.time_at_level.get(level, 0) + seconds
+
+    def add_fade_step(self, record):
+        """
+        Group a brightness change into a fade.
+
+        :param record: A :py:class:`HistoryRecord` object.
+
+        The change extends the current fade when it was triggered by ``step``
+        and goes in the same direction, otherwise the current fade is finished
+        (see :py:func:`finish_fade()`) and a new fade may be started.
+        """
+        direction = (record.new_value > record.old_value) - (record.new_value < record.old_value)
+        if record.trigger != 'step' or direction == 0:
+            self.finish_fade()
+            return
+        if direction != self.fade_direction:
+            self.finish_fade()
+            self.fade_direction = direction
+            self.fade_start = record.timestamp
+        self.fade_end = record.timestamp
+
+    def finish_fade(self):
+        """Count the current fade (if any)."""
+        if self.fade_direction != 0:
+            self.num_fades += 1
+            self.total_fade_time += self.fade_end - self.fade_start
+            self.fade_direction = 0
+            self.fade_start = None
+            self.fade_end = None
@@ -0,0 +1,296 @@
+# Automatically adjust the display brightness of Linux displays.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://github.com/xolox/python-auto-adjust-display-brightness
+
+"""
+Tracking of displays and back lights that are added or removed at runtime.
+
+Docking or undocking a laptop adds and removes ``xrandr`` outputs and
+sometimes back light devices. When ``auto-adjust-display-brightness`` runs as a
+daemon the :py:class:`HotplugMonitor` class listens for kernel uevents (on a
+netlink socket) in the ``backlight`` and ``drm`` subsystems and updates only
+the affected brightness controllers, so that nothing has to be rebuilt.
+"""
+
+# Standard library modules.
+import errno
+import logging
+import os
+import re
+import select
+import socket
+
+# External dependencies.
+from executor import ExternalCommandFailed
+
+# Modules included in our package.
+from aadb import BacklightBrightnessController, SoftwareBrightnessController, execute
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+# The netlink protocol used by the kernel to broadcast uevents (see linux/netlink.h).
+NETLINK_KOBJECT_UEVENT = 15
+
+# The netlink multicast group of uevents sent by the kernel (not by udev).
+UEVENT_GROUP_KERNEL = 1
+
+# The maximum size of a single uevent message.
+UEVENT_BUFFER_SIZE = 1024 * 16
+
+# The requested size of the socket receive buffer. The socket receives all
+# kernel uevents (not just the ones we're interested in) and docking a laptop
+# can produce a burst of uevents, so the default buffer size is too small.
+UEVENT_RECEIVE_BUFFER = 1024 * 1024
+
+# Values of the SOURCE property of back light `change' uevents that report a
+# brightness update (including our own writes) instead of a device change.
+BRIGHTNESS_SOURCES = ('sysfs', 'hotkey')
+
+# The kernel subsystems whose uevents we're interested in.
+SUBSYSTEMS = ('backlight', 'drm')
+
+
+def parse_uevent(data):
+    """
+    Parse a uevent message broadcast by the kernel.
+
+    :param data: The raw message received from the netlink socket (a string).
+    :returns: A :py:class:`UEvent` object or ``None`` when the message isn't a
+              kernel uevent.
+
+    Kernel uevents consist of a header like ``add@/devices/...`` followed by
+    ``KEY=VALUE`` pairs, all separated by NUL bytes.
+    """
+    if not isinstance(data, type(u'')):
+        data = data.decode('UTF-8', 'replace')
+    fields = data.split(u'\0')
+    action, _, devpath = fields.pop(0).partition(u'@')
+    if not (action and devpath):
+        # Messages broadcast by udev start with `libudev' instead.
+        return None
+    properties = {}
+    for field in fields:
+        key, _, value = field.partition(u'=')
+        if key:
+            properties[key] = value
+    return UEvent(action=properties.get('ACTION', action),
+                  devpath=properties.get('DEVPATH', devpath),
+                  subsystem=properties.get('SUBSYSTEM', ''),
+                  properties=properties)
+
+
+def find_connected_outputs():
+    """
+    Find the names of the ``xrandr`` outputs that are currently connected.
+
+    :returns: A set of lowercased output names (strings).
+    """
+    connected = set()
+    listing = execute('xrandr', '--query', capture=True)
+    for line in listing.splitlines():
+        # Check for a line that introduces a connected output, something like:
+        # eDP1 connected 1440x900+0+0 (normal left inverted right ...) 30mm x 179mm
+        match = re.match(r'^(\S+)\s+connected\s+', line, re.IGNORECASE)
+        if match:
+            connected.add(match.group(1).lower())
+    return connected
+
+
+class UEvent(object):
+
+    """A parsed kernel uevent (see :py:func:`parse_uevent()`)."""
+
+    def __init__(self, action, devpath, subsystem, properties):
+        """
+        Initialize a :py:class:`UEvent` object.
+
+        :param action: The action that triggered the event (a string like
+                       ``add``, ``remove`` or ``change``).
+        :param devpath: The pathname of the device in ``/sys`` (a string).
+        :param subsystem: The name of the kernel subsystem (a string).
+        :param properties: A dictionary with all properties of the event.
+        """
+        self.action = action
+        self.devpath = devpath
+        self.subsystem = subsystem
+        self.properties = properties
+
+    @property
+    def name(self):
+        """The kernel name of the device (the last component of :py:attr:`devpath`)."""
+        return os.path.basename(self.devpath.rstrip('/'))
+
+
+class HotplugMonitor(object):
+
+    """
+    Update brightness controllers based on kernel uevents.
+
+    The events are handled as follows:
+
+    - ``backlight`` events only affect the :py:class:`.BacklightBrightnessController`
+      objects whose ``sys_directory`` refers to the device in question. When
+      the device is removed the controller is marked as unavailable, when it
+      is added the controller is marked as available and its cached maximum
+      brightness is discarded. Events that merely report a brightness update
+      are ignored.
+
+    - ``drm`` events that report a connector being added, removed or changed
+      trigger a single ``xrandr --query`` command which is used to update the
+      availability of all :py:class:`.SoftwareBrightnessController` objects.
+
+    Synthetic uevents can be injected using :py:func:`handle_uevent()`, this
+    doesn't require :py:func:`start()` to have been called.
+    """
+
+    def __init__(self, controllers):
+        """
+        Initialize a :py:class:`HotplugMonitor` object.
+
+        :param controllers: A list of :py:class:`.BrightnessController` objects.
+        """
+        self.controllers = controllers
+        self.socket = None
+
+    @property
+    def backlight_controllers(self):
+        """A list of the :py:class:`.BacklightBrightnessController` objects being monitored."""
+        return [c for c in self.controllers if isinstance(c, BacklightBrightnessController)]
+
+    @property
+    def software_controllers(self):
+        """A list of the :py:class:`.SoftwareBrightnessController` objects being monitored."""
+        return [c for c in self.controllers if isinstance(c, SoftwareBrightnessController)]
+
+    def start(self):
+        """
+        Start listening for kernel uevents.
+
+        This opens the netlink socket and checks which displays are currently
+        available (so that later events only need to apply incremental
+        changes).
+
+        :raises: :py:exc:`socket.error` when the netlink socket can't be opened.
+        """
+        self.socket = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UEVENT_RECEIVE_BUFFER)
+        self.socket.bind((0, UEVENT_GROUP_KERNEL))
+        logger.debug("Listening for kernel uevents in %s subsystems ..", ' and '.join(SUBSYSTEMS))
+        self.refresh_backlights()
+        self.refresh_outputs()
+
+    def stop(self):
+        """Stop listening for kernel uevents."""
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def wait(self, timeout):
+        """
+        Wait for kernel uevents and handle them.
+
+        :param timeout: The maximum number of seconds to wait (a number).
+        :returns: The number of relevant uevents that were handled (an integer).
+
+        When the socket receive buffer overflowed (because of a burst of
+        uevents) some events were lost, in which case the availability of all
+        displays is checked again.
+        """
+        num_handled = 0
+        readable, _, _ = select.select([self.socket], [], [], timeout)
+        while readable:
+            try:
+                data = self.socket.recv(UEVENT_BUFFER_SIZE, socket.MSG_DONTWAIT)
+            except socket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                if e.errno == errno.ENOBUFS:
+                    logger.warning("Lost kernel uevents (receive buffer overflowed), rechecking displays ..")
+                    self.refresh_backlights()
+                    self.refresh_outputs()
+                    num_handled += 1
+                    continue
+                raise
+            if self.handle_uevent(data):
+                num_handled += 1
+        return num_handled
+
+    def handle_uevent(self, data):
+        """
+        Handle a single uevent message.
+
+        :param data: The raw uevent message (a string).
+        :returns: ``True`` when the event was relevant, ``False`` otherwise.
+        """
+        event = parse_uevent(data)
+        if event is None or event.subsystem not in SUBSYSTEMS:
+            return False
+        logger.debug("Handling %s event of %s device %s ..", event.action, event.subsystem, event.devpath)
+        if event.subsystem == 'backlight':
+            return self.update_backlight(event)
+        elif event.action in ('add', 'remove') or event.properties.get('HOTPLUG') == '1':
+            self.refresh_outputs()
+            return True
+        return False
+
+    def update_backlight(self, event):
+        """
+        Update the back light controller(s) affected by a uevent.
+
+        :param event: A :py:class:`UEvent` object.
+        :returns: ``True`` when a controller was updated, ``False`` otherwise
+                  (e.g. because the event concerns a device that isn't
+                  configured).
+
+        The kernel sends a ``change`` event on every brightness update (with
+        the ``SOURCE`` property set to ``sysfs`` or ``hotkey``), these events
+        are ignored. Cached information is only discarded when a device is
+        added (because it may be a different device with the same name).
+        """
+        if event.action == 'change' and event.properties.get('SOURCE') in BRIGHTNESS_SOURCES:
+            return False
+        updated = False
+        for controller in self.backlight_controllers:
+            if controller.device_name == event.name:
+                if event.action == 'remove':
+                    updated |= self.set_available(controller, False)
+                else:
+                    updated |= self.set_available(controller, True)
+                    if event.action == 'add':
+                        controller.invalidate()
+                        updated = True
+        return updated
+
+    def refresh_backlights(self):
+        """Check which of the configured back lights are currently available."""
+        for controller in self.backlight_controllers:
+            self.set_available(controller, os.path.isdir(controller.sys_directory))
+
+    def refresh_outputs(self):
+        """Check which of the configured ``xrandr`` outputs are currently connected."""
+        controllers = self.software_controllers
+        if controllers:
+            try:
+                connected = find_connected_outputs()
+            except ExternalCommandFailed as e:
+                logger.warning("Failed to check which displays are connected! (%s)", e)
+                return
+            for controller in controllers:
+                self.set_available(controller, controller.output_name.lower() in connected)
+
+    def set_available(self, controller, available):
+        """
+        Change whether a brightness controller is available.
+
+        :param controller: A :py:class:`.BrightnessController` object.
+        :param available: ``True`` if the display is available, ``False`` otherwise.
+        :returns: ``True`` if the availability changed, ``False`` otherwise.
+        """
+        if controller.available != available:
+            logger.info("Display %s is %s.", controller, "now available" if available else "no longer available")
+            controller.available = available
+            return True
+        return False
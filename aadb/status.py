@@ -0,0 +1,321 @@
+# Automatically adjust the display brightness of Linux displays.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://github.com/xolox/python-auto-adjust-display-brightness
+
+"""
+Publishing of display brightness in a memory mapped status file.
+
+Status bars and panels that show the display brightness would otherwise have
+to run ``xrandr`` or read ``/sys/class/backlight`` themselves. When
+``auto-adjust-display-brightness`` runs as a daemon the
+:py:class:`StatusExporter` class publishes the state of each display in a small
+file with a fixed layout, which can be read using :py:func:`read_status()` or
+:py:class:`StatusReader` (without running any external commands).
+
+The file starts with a header (:data:`HEADER_FORMAT`) followed by
+:data:`MAX_CONTROLLERS` records (:data:`RECORD_FORMAT`). The header contains a
+sequence number that is odd while the status is being updated, this enables
+readers to detect and retry inconsistent reads without any locking.
+"""
+
+# Standard library modules.
+import collections
+import logging
+import mmap
+import os
+import stat
+import struct
+import time
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+# The magic bytes at the start of the status file.
+MAGIC = b'AADB'
+
+# The version of the layout of the status file.
+VERSION = 1
+
+# The layout of the header: magic, version, number of records, sequence number.
+HEADER_FORMAT = '<4sHHQ'
+
+# The offset of the sequence number in the header.
+SEQUENCE_OFFSET = 8
+
+# The layout of a record: name, flags, raw brightness, brightness percentage,
+# target percentage and the time of the last change (in seconds since the
+# Unix epoch).
+RECORD_FORMAT = '<32sIdddd'
+
+# The maximum number of displays that can be published.
+MAX_CONTROLLERS = 16
+
+# The total size of the status file (in bytes).
+STATUS_FILE_SIZE = struct.calcsize(HEADER_FORMAT) + MAX_CONTROLLERS * struct.calcsize(RECORD_FORMAT)
+
+# Set in the flags of a record when the display is available.
+FLAG_AVAILABLE = 1
+
+# The base name of the status file.
+STATUS_FILE_NAME = 'auto-adjust-display-brightness.status'
+
+# The number of times StatusReader retries inconsistent reads.
+READ_RETRIES = 100
+
+# The number of seconds StatusReader waits between retries.
+RETRY_DELAY = 0.001
+
+# Used for floating point values that are unknown.
+UNKNOWN = float('nan')
+
+ControllerStatus = collections.namedtuple('ControllerStatus', (
+    'name', 'available', 'raw_value', 'percentage', 'target_percentage', 'last_change',
+))
+"""
+The published state of a single display (a :py:func:`~collections.namedtuple()`).
+
+Unknown values are ``None``, the time of the last change is a number of
+seconds since the Unix epoch.
+"""
+
+
+def get_status_files():
+    """
+    Get the possible locations of the status file.
+
+    :returns: A list of pathnames (strings). The first location is in the
+              runtime directory of the current user (only when
+              ``$XDG_RUNTIME_DIR`` is set), the last location is used when
+              the daemon runs as ``root``.
+
+    There's deliberately no fall back to a shared directory like ``/tmp``
+    because other users could create the status file in advance.
+    """
+    filenames = []
+    runtime_directory = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_directory:
+        filenames.append(os.path.join(runtime_directory, STATUS_FILE_NAME))
+    filenames.append(os.path.join('/run', STATUS_FILE_NAME))
+    return filenames
+
+
+def find_status_file():
+    """
+    Find the status file published by a running daemon.
+
+    :returns: The pathname of the status file (a string) or ``None`` when no
+              status file exists.
+    """
+    for filename in get_status_files():
+        if os.path.isfile(filename):
+            return filename
+
+
+def read_status(filename=None):
+    """
+    Read the published state of all displays.
+
+    :param filename: The pathname of the status file (a string, defaults to
+                     the result of :py:func:`find_status_file()`).
+    :returns: A list of :py:class:`ControllerStatus` objects.
+    :raises: :py:exc:`~exceptions.EnvironmentError` when the status file
+             doesn't exist, :py:exc:`StatusError` when the status file is
+             invalid.
+    """
+    reader = StatusReader(filename)
+    try:
+        return reader.read()
+    finally:
+        reader.close()
+
+
+def none_if_unknown(value):
+    """
+    Translate unknown floating point values to ``None``.
+
+    :param value: A floating point number.
+    :returns: The given number or ``None`` when the number is NaN.
+    """
+    return None if value != value else value
+
+
+class StatusExporter(object):
+
+    """Publish the state of brightness controllers in a memory mapped status file."""
+
+    def __init__(self, controllers, filename=None):
+        """
+        Initialize a :py:class:`StatusExporter` object.
+
+        :param controllers: A list of :py:class:`.BrightnessController` objects.
+        :param filename: The pathname of the status file (a string, defaults to
+                         a file in ``/run`` when running as ``root`` and a file
+                         in ``$XDG_RUNTIME_DIR`` otherwise).
+        """
+        if len(controllers) > MAX_CONTROLLERS:
+            logger.warning("Only publishing status of the first %i displays!", MAX_CONTROLLERS)
+        self.controllers = controllers[:MAX_CONTROLLERS]
+        if not filename and (os.getuid() == 0 or os.environ.get('XDG_RUNTIME_DIR')):
+            filename = get_status_files()[-1 if os.getuid() == 0 else 0]
+        self.filename = filename
+        self.mapping = None
+        self.sequence = 0
+
+    def open(self):
+        """
+        Create the status file and map it into memory.
+
+        :raises: :py:exc:`~exceptions.EnvironmentError` when the status file
+                 can't be created, when ``$XDG_RUNTIME_DIR`` isn't set (and no
+                 filename was given) or when the status file is a symbolic
+                 link or isn't owned by the current user.
+        """
+        if not self.filename:
+            raise IOError("Can't publish display status because $XDG_RUNTIME_DIR isn't set!")
+        logger.debug("Publishing display status in %s ..", self.filename)
+        fd = os.open(self.filename, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o644)
+        try:
+            info = os.fstat(fd)
+            if info.st_uid != os.getuid() or not stat.S_ISREG(info.st_mode):
+                msg = "Refusing to publish display status in %s (not a regular file owned by the current user)!"
+                raise IOError(msg % self.filename)
+            os.ftruncate(fd, STATUS_FILE_SIZE)
+            self.mapping = mmap.mmap(fd, STATUS_FILE_SIZE, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        # Continue from the sequence number left behind by a previous daemon
+        # (rounded up to an even number) so that readers that kept the file
+        # mapped don't mistake a partial update for a consistent snapshot.
+        magic, version, _, sequence = struct.unpack_from(HEADER_FORMAT, self.mapping, 0)
+        self.sequence = sequence + sequence % 2 if (magic, version) == (MAGIC, VERSION) else 0
+        self.publish()
+
+    def close(self):
+        """Unmap the status file."""
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+
+    def publish(self):
+        """Publish the current state of the brightness controllers."""
+        # Mark the status as being updated.
+        self.sequence += 1
+        struct.pack_into(HEADER_FORMAT, self.mapping, 0, MAGIC, VERSION, len(self.controllers), self.sequence)
+        offset = struct.calcsize(HEADER_FORMAT)
+        for controller in self.controllers:
+            struct.pack_into(RECORD_FORMAT, self.mapping, offset, *self.encode_record(controller))
+            offset += struct.calcsize(RECORD_FORMAT)
+        # Mark the status as consistent again.
+        self.sequence += 1
+        struct.pack_into('<Q', self.mapping, SEQUENCE_OFFSET, self.sequence)
+
+    def encode_record(self, controller):
+        """
+        Get the values of the record that describes a brightness controller.
+
+        :param controller: A :py:class:`.BrightnessController` object.
+        :returns: A tuple of values matching :data:`RECORD_FORMAT`.
+        """
+        name = controller.friendly_name
+        if not isinstance(name, bytes):
+            name = name.encode('UTF-8')
+        raw_value, percentage = UNKNOWN, UNKNOWN
+        if controller.brightness is not None:
+            raw_value = float(controller.brightness)
+            try:
+                percentage = float(controller.brightness_to_percentage(controller.brightness))
+            except Exception as e:
+                logger.debug("Failed to calculate brightness percentage of %s! (%s)", controller, e)
+        return (name[:32],
+                FLAG_AVAILABLE if controller.available else 0,
+                raw_value,
+                percentage,
+                UNKNOWN if controller.target_percentage is None else float(controller.target_percentage),
+                UNKNOWN if controller.last_change is None else float(controller.last_change))
+
+
+class StatusReader(object):
+
+    """Read the state of displays published by :py:class:`StatusExporter`."""
+
+    def __init__(self, filename=None, retries=READ_RETRIES):
+        """
+        Initialize a :py:class:`StatusReader` object.
+
+        :param filename: The pathname of the status file (a string, defaults to
+                         the result of :py:func:`find_status_file()`).
+        :param retries: The number of times to retry when the status is being
+                        updated while it's being read (an integer, there's a
+                        short delay of :data:`RETRY_DELAY` seconds between
+                        retries).
+        :raises: :py:exc:`~exceptions.EnvironmentError` when the status file
+                 doesn't exist, :py:exc:`StatusError` when the status file is
+                 incomplete (e.g. because it's still being created).
+
+        The status file stays mapped into memory until :py:func:`close()` is
+        called, so long running programs (like status bars) can call
+        :py:func:`read()` as often as they like.
+        """
+        self.filename = filename or find_status_file() or get_status_files()[0]
+        self.retries = retries
+        self.mapping = None
+        with open(self.filename, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size < STATUS_FILE_SIZE:
+                raise StatusError("The status file %s is incomplete!" % self.filename)
+            self.mapping = mmap.mmap(handle.fileno(), STATUS_FILE_SIZE, mmap.MAP_SHARED, mmap.PROT_READ)
+
+    def close(self):
+        """Unmap the status file."""
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+
+    def read(self):
+        """
+        Read the published state of all displays.
+
+        :returns: A list of :py:class:`ControllerStatus` objects.
+        :raises: :py:exc:`StatusError` when the status file is invalid or no
+                 consistent snapshot could be read.
+        """
+        for _ in range(self.retries):
+            magic, version, count, before = struct.unpack_from(HEADER_FORMAT, self.mapping, 0)
+            if magic != MAGIC or version != VERSION:
+                raise StatusError("Unsupported status file format in %s!" % self.filename)
+            if before % 2 == 0:
+                data = self.mapping[:STATUS_FILE_SIZE]
+                after = struct.unpack_from('<Q', self.mapping, SEQUENCE_OFFSET)[0]
+                if before == after:
+                    return self.decode_records(data, min(count, MAX_CONTROLLERS))
+            time.sleep(RETRY_DELAY)
+        raise StatusError("Failed to read consistent status from %s!" % self.filename)
+
+    def decode_records(self, data, count):
+        """
+        Decode the records in a snapshot of the status file.
+
+        :param data: A snapshot of the status file (a byte string).
+        :param count: The number of records in the snapshot (an integer).
+        :returns: A list of :py:class:`ControllerStatus` objects.
+        """
+        records = []
+        offset = struct.calcsize(HEADER_FORMAT)
+        for _ in range(count):
+            name, flags, raw_value, percentage, target, last_change = struct.unpack_from(RECORD_FORMAT, data, offset)
+            records.append(ControllerStatus(
+                name=name.rstrip(b'\0').decode('UTF-8', 'replace'),
+                available=bool(flags & FLAG_AVAILABLE),
+                raw_value=none_if_unknown(raw_value),
+                percentage=none_if_unknown(percentage),
+                target_percentage=none_if_unknown(target),
+                last_change=none_if_unknown(last_change),
+            ))
+            offset += struct.calcsize(RECORD_FORMAT)
+        return records
+
+
+class StatusError(Exception):
+
+    """Raised by :py:class:`StatusReader` when the status file can't be read."""
@@ -0,0 +1,246 @@
+# Automatically adjust the display brightness of Linux displays.
+#
+# Author: Peter Odding <peter@peterodding.com>
+# Last Change: October 18, 2026
+# URL: https://github.com/xolox/python-auto-adjust-display-brightness
+
+"""
+Test suite for the `auto-adjust-display-brightness` package.
+
+The tests don't touch any real displays: brightness controllers are pointed at
+temporary directories and kernel uevents are injected as synthetic messages.
+The tests can be run using ``python -m aadb.tests``.
+"""
+
+# Standard library modules.
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+# External dependencies.
+import coloredlogs
+
+# Modules included in our package.
+import aadb.hotplug
+from aadb import BacklightBrightnessController, SoftwareBrightnessController
+from aadb.helper import HelperClient, HelperServer
+from aadb.history import HistoryLog, HistoryReader
+from aadb.hotplug import HotplugMonitor, parse_uevent
+from aadb.status import StatusError, StatusExporter, StatusReader
+
+# Initialize a logger for this module.
+logger = logging.getLogger(__name__)
+
+
+def make_uevent(action, devpath, subsystem, **properties):
+    """
+    Construct a synthetic kernel uevent message.
+
+    :param action: The action that triggered the event (a string).
+    :param devpath: The pathname of the device in ``/sys`` (a string).
+    :param subsystem: The name of the kernel subsystem (a string).
+    :param properties: Any additional properties of the event.
+    :returns: The raw uevent message (a byte string).
+    """
+    fields = ['%s@%s' % (action, devpath), 'ACTION=%s' % action,
+              'DEVPATH=%s' % devpath, 'SUBSYSTEM=%s' % subsystem]
+    fields.extend('%s=%s' % (k, v) for k, v in sorted(properties.items()))
+    return '\0'.join(fields).encode('UTF-8') + b'\0'
+
+
+class AutoAdjustDisplayBrightnessTestCase(unittest.TestCase):
+
+    """Container for the `auto-adjust-display-brightness` tests."""
+
+    def setUp(self):
+        """Enable verbose logging and create a temporary directory."""
+        coloredlogs.install(level=logging.DEBUG)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.directory)
+
+    def create_backlight(self, name, max_brightness=100):
+        """
+        Create a fake back light device and a controller for it.
+
+        :param name: The name of the back light device (a string).
+        :param max_brightness: The maximum brightness of the device (an integer).
+        :returns: A :py:class:`.BacklightBrightnessController` object.
+        """
+        sys_directory = os.path.join(self.directory, name)
+        os.mkdir(sys_directory)
+        with open(os.path.join(sys_directory, 'max_brightness'), 'w') as handle:
+            handle.write('%i\n' % max_brightness)
+        return BacklightBrightnessController(friendly_name=name, sys_directory=sys_directory)
+
+    def test_parse_uevent(self):
+        """Test parsing of kernel uevent messages."""
+        event = parse_uevent(make_uevent('add', '/devices/pci0000:00/backlight/intel_backlight',
+                                         'backlight', SOURCE='sysfs'))
+        assert event.action == 'add'
+        assert event.subsystem == 'backlight'
+        assert event.name == 'intel_backlight'
+        assert event.properties['SOURCE'] == 'sysfs'
+        # Messages broadcast by udev are ignored.
+        assert parse_uevent(b'libudev\0\xfe\xed\xca\xfe') is None
+
+    def test_backlight_uevents(self):
+        """Test that back light uevents only update the affected controller."""
+        controller = self.create_backlight('intel_backlight')
+        other_controller = self.create_backlight('acpi_video0')
+        monitor = HotplugMonitor([controller, other_controller])
+        devpath = '/devices/pci0000:00/drm/card0/card0-eDP-1/intel_backlight'
+        assert controller.get_maximum_brightness() == 100
+        # Removing the device marks (only) its controller as unavailable.
+        assert monitor.handle_uevent(make_uevent('remove', devpath, 'backlight'))
+        assert not controller.available
+        assert other_controller.available
+        # Adding the device marks it as available and discards cached information.
+        assert monitor.handle_uevent(make_uevent('add', devpath, 'backlight'))
+        assert controller.available
+        assert controller.max_brightness is None
+        # Brightness updates don't discard cached information.
+        assert controller.get_maximum_brightness() == 100
+        assert not monitor.handle_uevent(make_uevent('change', devpath, 'backlight', SOURCE='sysfs'))
+        assert not monitor.handle_uevent(make_uevent('change', devpath, 'backlight', SOURCE='hotkey'))
+        assert controller.max_brightness == 100
+        # Events of devices that aren't configured are irrelevant.
+        assert not monitor.handle_uevent(make_uevent('remove', '/devices/platform/dell_backlight', 'backlight'))
+        # Events of other subsystems are irrelevant.
+        assert not monitor.handle_uevent(make_uevent('add', '/devices/platform/serial8250', 'tty'))
+
+    def test_drm_uevents(self):
+        """Test that DRM hotplug uevents update the availability of ``xrandr`` outputs."""
+        controller = SoftwareBrightnessController(friendly_name='External monitor', output_name='HDMI1')
+        backlight = self.create_backlight('intel_backlight')
+        monitor = HotplugMonitor([controller, backlight])
+        connected_outputs = set(['edp1'])
+        original_function = aadb.hotplug.find_connected_outputs
+        aadb.hotplug.find_connected_outputs = lambda: connected_outputs
+        try:
+            assert monitor.handle_uevent(make_uevent('change', '/devices/pci0000:00/drm/card0', 'drm', HOTPLUG='1'))
+            assert not controller.available
+            connected_outputs.add('hdmi1')
+            assert monitor.handle_uevent(make_uevent('add', '/devices/pci0000:00/drm/card0/card0-HDMI-A-1', 'drm'))
+            assert controller.available
+            # DRM events don't affect back lights.
+            assert backlight.available
+        finally:
+            aadb.hotplug.find_connected_outputs = original_function
+
+    def test_status_round_trip(self):
+        """Test that the status published by the daemon can be read back."""
+        backlight = self.create_backlight('intel_backlight', max_brightness=200)
+        backlight.brightness = 100
+        backlight.target_percentage = 10
+        backlight.last_change = 1234.5
+        software = SoftwareBrightnessController(friendly_name='External monitor', output_name='HDMI1')
+        software.available = False
+        filename = os.path.join(self.directory, 'status')
+        exporter = StatusExporter([backlight, software], filename=filename)
+        exporter.open()
+        reader = StatusReader(filename)
+        try:
+            first, second = reader.read()
+            assert first.name == 'intel_backlight'
+            assert first.available
+            assert first.raw_value == 100
+            assert first.percentage == 50
+            assert first.target_percentage == 10
+            assert first.last_change == 1234.5
+            assert second.name == 'External monitor'
+            assert not second.available
+            assert second.raw_value is None
+            # Updates are visible through the existing mapping.
+            backlight.brightness = 40
+            exporter.publish()
+            assert reader.read()[0].percentage == 20
+            # A restarted daemon continues from the existing sequence number.
+            sequence = exporter.sequence
+            exporter.close()
+            exporter = StatusExporter([backlight], filename=filename)
+            exporter.open()
+            assert exporter.sequence > sequence
+            assert exporter.sequence % 2 == 0
+            assert len(reader.read()) == 1
+        finally:
+            reader.close()
+            exporter.close()
+
+    def test_incomplete_status_file(self):
+        """Test that reading an incomplete status file raises the documented exception."""
+        filename = os.path.join(self.directory, 'status')
+        with open(filename, 'wb') as handle:
+            handle.write(b'A')
+        self.assertRaises(StatusError, StatusReader, filename)
+
+    def test_helper_access_control(self):
+        """Test that the privileged helper rejects requests from users that aren't allowed."""
+        server = HelperServer(socket_file=os.path.join(self.directory, 'helper.sock'))
+        server.listen()
+
+        def handle_request():
+            client, _ = server.socket.accept()
+            try:
+                server.handle_client(client)
+            finally:
+                client.close()
+        thread = threading.Thread(target=handle_request)
+        thread.start()
+        try:
+            client = HelperClient(server.socket_file)
+            client.queue('intel_backlight', 100)
+            client.queue('acpi_video0', 50)
+            assert client.flush() == {
+                'intel_backlight': 'Permission denied!',
+                'acpi_video0': 'Permission denied!',
+            }
+        finally:
+            thread.join()
+            server.close()
+        assert not os.path.exists(server.socket_file)
+
+    def test_history_wraparound(self):
+        """Test that the history ring buffer keeps the most recent changes in order."""
+        filename = os.path.join(self.directory, 'history')
+        log = HistoryLog(filename=filename, capacity=4)
+        controller = self.create_backlight('intel_backlight')
+        controller.change_duration = 0.01
+        # Three steps up (one fade), a forced change and two steps down.
+        for timestamp, old_value, new_value, trigger in ((10, 10, 20, 'step'),
+                                                         (20, 20, 30, 'step'),
+                                                         (30, 30, 40, 'step'),
+                                                         (40, 40, 80, 'force'),
+                                                         (50, 80, 70, 'step'),
+                                                         (70, 70, 60, 'step')):
+            controller.last_change = timestamp
+            controller.previous_brightness = old_value
+            controller.brightness = new_value
+            log.append([controller], trigger)
+        reader = HistoryReader(filename)
+        try:
+            # Only the four most recent changes are left.
+            assert [r.timestamp for r in reader.get_records()] == [30, 40, 50, 70]
+            assert [r.timestamp for r in reader.get_records(since=35, until=60)] == [40, 50]
+            stats = reader.get_statistics(until=100)['intel_backlight']
+            assert stats.num_changes == 4
+            assert stats.triggers == {'force': 1, 'step': 3}
+            # The remaining step up counts as a fade of its own.
+            assert stats.num_fades == 2
+            assert stats.total_fade_time == 20
+            # The level at the start of the date range is found by looking back.
+            stats = reader.get_statistics(since=45, until=100)['intel_backlight']
+            assert stats.num_changes == 2
+            assert stats.num_fades == 1
+            assert stats.time_at_level == {80: 5, 70: 20, 60: 30}
+        finally:
+            reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
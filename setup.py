@@ -50,6 +50,7 @@ setup(
     ],
     entry_points=dict(console_scripts=[
         'auto-adjust-display-brightness = aadb:main',
+        'auto-adjust-display-brightness-helper = aadb.helper:main',
     ]),
     classifiers=[
         'Development Status :: 4 - Beta',